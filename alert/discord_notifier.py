@@ -71,6 +71,7 @@ class DiscordNotifier:
             "value": (
                 f"**Total sequences:** {summary['total_sequences']}\n"
                 f"**Anomalies detected:** {summary['anomalies']}\n"
+                f"**Distinct patterns:** {summary.get('anomaly_groups', len(anomalies))}\n"
                 f"**Anomaly rate:** {summary['anomaly_rate']}%\n"
                 f"**Total log entries:** {summary['total_log_entries']}"
             ),
@@ -90,13 +91,18 @@ class DiscordNotifier:
                     'DEBUG': '🐞'
                 }.get(level, '📝')
             
+            count = anomaly.get('count', 1)
             value_text = (
+                f"**Occurrences:** {count}\n"
                 f"**Request ID:** `{anomaly['request_id'][:30]}...`\n"
                 f"**Error:** {anomaly['reconstruction_error']:.4f} (threshold: {anomaly['threshold']:.4f})\n"
                 f"**Confidence:** {anomaly['confidence']:.2%}\n"
                 f"**Sequence length:** {anomaly['sequence_length']}"
             )
             
+            if anomaly.get('fingerprint'):
+                value_text += f"\n**Fingerprint:** `{anomaly['fingerprint']}`"
+            
             if anomaly.get('log_entries') and len(anomaly['log_entries']) > 0:
                 first_log = anomaly['log_entries'][0]
                 level = first_log.get('Level', 'N/A')
@@ -108,14 +114,14 @@ class DiscordNotifier:
                     value_text += f"\n**Content:** {content}..."
             
             embed["fields"].append({
-                "name": f"{level_emoji} Anomaly #{i}",
+                "name": f"{level_emoji} Anomaly #{i}" + (f" (x{count})" if count > 1 else ""),
                 "value": value_text,
                 "inline": False
             })
         
         if len(anomalies) > 5:
             embed["footer"] = {
-                "text": f"... and {len(anomalies) - 5} more anomalies. Full details saved to JSON file."
+                "text": f"... and {len(anomalies) - 5} more anomaly patterns. Full details saved to JSON file."
             }
         else:
             embed["footer"] = {
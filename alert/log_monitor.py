@@ -2,6 +2,7 @@ import os
 import sys
 import json
 import time
+import hashlib
 from datetime import datetime, timedelta
 import requests
 import pandas as pd
@@ -13,11 +14,22 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from inference.anomaly_detector import AnomalyDetector
 from inference.log_processor import OpenStackLogProcessor
+from inference.threshold_calibrator import OnlineThresholdCalibrator
 from alert.discord_notifier import DiscordNotifier
 
 
+MAX_EXAMPLE_REQUEST_IDS = 10
+MAX_EXCERPT_LOG_ENTRIES = 20
+
+
+def fingerprint_sequence(templates):
+    # Stable across cycles: Drain templates, unlike the per-batch encoded EventIDs
+    joined = '\x1f'.join(str(t) for t in templates)
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()[:16]
+
+
 class LogMonitor:    
-    def __init__(self, es_host, es_username, es_password, index_pattern, output_dir, discord_webhook_url, discord_enabled=True, save_json=True):
+    def __init__(self, es_host, es_username, es_password, index_pattern, output_dir, discord_webhook_url, discord_enabled=True, save_json=True, online_calibration=False, calibration_quantile=0.99, calibration_min_threshold=None, calibration_max_threshold=None, calibration_period_minutes=60, calibration_window_periods=24):
         self.es_host = es_host
         self.es_username = es_username
         self.es_password = es_password
@@ -58,11 +70,29 @@ class LogMonitor:
             BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             model_path = os.path.join(BASE_DIR, 'model', 'lstm_autoencoder_model.pth')
             
+            self.calibrator = None
+            if online_calibration:
+                self.calibrator = OnlineThresholdCalibrator(
+                    base_threshold=0.280038,
+                    quantile=calibration_quantile,
+                    min_threshold=calibration_min_threshold,
+                    max_threshold=calibration_max_threshold,
+                    period_minutes=calibration_period_minutes,
+                    window_periods=calibration_window_periods,
+                    state_path=os.path.join(output_dir, 'threshold_calibration.json')
+                )
+                print(
+                    f"Online threshold calibration enabled (quantile: {calibration_quantile}, "
+                    f"bounds: [{self.calibrator.min_threshold:.4f}, {self.calibrator.max_threshold:.4f}], "
+                    f"window: {calibration_window_periods} x {calibration_period_minutes} min)"
+                )
+            
             self.detector = AnomalyDetector(
                 model_path=model_path,
                 threshold=0.280038,
                 max_seq_len=100,
-                vocab_size=36
+                vocab_size=36,
+                calibrator=self.calibrator
             )
             print("Anomaly detector initialized")
         except Exception as e:
@@ -166,6 +196,9 @@ class LogMonitor:
             processed_df = self.log_processor.process_raw_logs(log_text)
             print(f"Parsed {len(processed_df)} log entries")
             
+            cache_stats = self.log_processor.get_template_cache_stats()
+            print(f"Template cache hit rate: {cache_stats['hit_rate']:.1%} ({cache_stats['hits']} hits, {cache_stats['misses']} misses)")
+            
             sequences = self.log_processor.extract_sequences(processed_df)
             print(f"Extracted {len(sequences)} sequences")
             
@@ -176,28 +209,71 @@ class LogMonitor:
             sequence_list = list(sequences.values())
             request_ids = list(sequences.keys())
             
-            predictions = self.detector.predict_batch_sequences(sequence_list)
+            # Calibrate per component: each request is keyed by the component of its first log entry
+            components = processed_df.groupby('RequestID')['Component'].first().to_dict()
+            keys = [components.get(req_id, 'global') for req_id in request_ids]
+            
+            predictions = self.detector.predict_batch_sequences(sequence_list, keys)
+            
+            # Group anomalies sharing the same template path; only one representative per group keeps its logs
+            template_paths = processed_df.groupby('RequestID')['EventTemplate'].apply(list).to_dict()
             
-            anomalies = []
+            groups = {}
+            total_anomalies = 0
             for i, pred in enumerate(predictions):
-                if pred.get('is_anomaly', False):
-                    anomaly_data = {
-                        'request_id': request_ids[i],
-                        'sequence': sequence_list[i],
-                        'sequence_length': len(sequence_list[i]),
-                        'reconstruction_error': pred['reconstruction_error'],
-                        'threshold': pred['threshold'],
-                        'confidence': pred['confidence'],
-                        'timestamp': datetime.utcnow().isoformat()
+                if not pred.get('is_anomaly', False):
+                    continue
+                
+                total_anomalies += 1
+                request_id = request_ids[i]
+                fingerprint = fingerprint_sequence(template_paths.get(request_id, sequence_list[i]))
+                group = groups.get(fingerprint)
+                
+                representative = {
+                    'request_id': request_id,
+                    'sequence': sequence_list[i],
+                    'sequence_length': len(sequence_list[i]),
+                    'reconstruction_error': pred['reconstruction_error'],
+                    'threshold': pred['threshold'],
+                    'confidence': pred['confidence'],
+                    'timestamp': datetime.utcnow().isoformat()
+                }
+                
+                if group is None:
+                    groups[fingerprint] = {
+                        'fingerprint': fingerprint,
+                        'count': 1,
+                        'request_ids': [request_id],
+                        **representative
                     }
-                    
-                    request_logs = processed_df[processed_df['RequestID'] == request_ids[i]]
-                    anomaly_data['log_entries'] = request_logs[['Datetime', 'Level', 'Component', 'Content', 'EventTemplate']].to_dict('records')
-                    
-                    anomalies.append(anomaly_data)
+                    continue
+                
+                group['count'] += 1
+                
+                # Representative is the member with the highest reconstruction error; all its fields move together
+                if pred['reconstruction_error'] > group['reconstruction_error']:
+                    group.update(representative)
+                
+                if len(group['request_ids']) < MAX_EXAMPLE_REQUEST_IDS:
+                    group['request_ids'].append(request_id)
+            
+            anomalies = sorted(groups.values(), key=lambda g: g['count'], reverse=True)
+            
+            # Examples always lead with the representative, followed by the earliest other members
+            for group in anomalies:
+                others = [r for r in group['request_ids'] if r != group['request_id']]
+                group['request_ids'] = [group['request_id']] + others[:MAX_EXAMPLE_REQUEST_IDS - 1]
+            
+            representatives = [group['request_id'] for group in anomalies]
+            representative_logs = processed_df[processed_df['RequestID'].isin(representatives)]
+            log_excerpts = {
+                req_id: req_logs[['Datetime', 'Level', 'Component', 'Content', 'EventTemplate']].head(MAX_EXCERPT_LOG_ENTRIES).to_dict('records')
+                for req_id, req_logs in representative_logs.groupby('RequestID')
+            }
+            for group in anomalies:
+                group['log_entries'] = log_excerpts.get(group['request_id'], [])
             
             total_sequences = len(predictions)
-            total_anomalies = len(anomalies)
             normal_sequences = total_sequences - total_anomalies
             
             result = {
@@ -206,13 +282,25 @@ class LogMonitor:
                     'total_log_entries': len(processed_df),
                     'total_sequences': total_sequences,
                     'anomalies': total_anomalies,
+                    'anomaly_groups': len(anomalies),
                     'normal': normal_sequences,
                     'anomaly_rate': round(total_anomalies / total_sequences * 100, 2) if total_sequences > 0 else 0
                 },
                 'anomalies': anomalies
             }
             
-            print(f"Detection complete: {total_anomalies} anomalies found out of {total_sequences} sequences")
+            if self.detector.calibrator is not None:
+                result['calibration'] = {
+                    key: {
+                        'threshold': self.detector.calibrator.threshold(key),
+                        'samples': window.count(),
+                        'quantiles': self.detector.calibrator.quantiles(key=key)
+                    }
+                    for key, window in self.detector.calibrator.windows.items()
+                }
+                self.detector.calibrator.save()
+            
+            print(f"Detection complete: {total_anomalies} anomalies ({len(anomalies)} distinct) found out of {total_sequences} sequences")
             
             return result
             
@@ -239,7 +327,7 @@ class LogMonitor:
                     json.dump(result, f, indent=2, ensure_ascii=False, default=str)
                 
                 print(f"Anomalies saved to {filepath}")
-                print(f"Total anomalies: {len(result['anomalies'])}")
+                print(f"Total anomalies: {result['summary']['anomalies']} in {len(result['anomalies'])} groups")
                 
             except Exception as e:
                 print(f"Error saving anomalies: {e}")
@@ -308,6 +396,12 @@ def main():
     DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL", "")
     DISCORD_ENABLED = os.getenv("DISCORD_ENABLED", "true").lower() == "true"
     SAVE_JSON = os.getenv("SAVE_JSON", "true").lower() == "true"
+    ONLINE_CALIBRATION = os.getenv("ONLINE_CALIBRATION", "false").lower() == "true"
+    CALIBRATION_QUANTILE = float(os.getenv("CALIBRATION_QUANTILE", "0.99"))
+    CALIBRATION_MIN_THRESHOLD = float(os.getenv("CALIBRATION_MIN_THRESHOLD")) if os.getenv("CALIBRATION_MIN_THRESHOLD") else None
+    CALIBRATION_MAX_THRESHOLD = float(os.getenv("CALIBRATION_MAX_THRESHOLD")) if os.getenv("CALIBRATION_MAX_THRESHOLD") else None
+    CALIBRATION_PERIOD_MINUTES = float(os.getenv("CALIBRATION_PERIOD_MINUTES", "60"))
+    CALIBRATION_WINDOW_PERIODS = int(os.getenv("CALIBRATION_WINDOW_PERIODS", "24"))
     
     monitor = LogMonitor(
         es_host=ES_HOST,
@@ -317,7 +411,13 @@ def main():
         output_dir=OUTPUT_DIR,
         discord_webhook_url=DISCORD_WEBHOOK_URL,
         discord_enabled=DISCORD_ENABLED,
-        save_json=SAVE_JSON
+        save_json=SAVE_JSON,
+        online_calibration=ONLINE_CALIBRATION,
+        calibration_quantile=CALIBRATION_QUANTILE,
+        calibration_min_threshold=CALIBRATION_MIN_THRESHOLD,
+        calibration_max_threshold=CALIBRATION_MAX_THRESHOLD,
+        calibration_period_minutes=CALIBRATION_PERIOD_MINUTES,
+        calibration_window_periods=CALIBRATION_WINDOW_PERIODS
     )
     
     monitor.start(interval_minutes=INTERVAL_MINUTES)
@@ -1,5 +1,6 @@
 from .model import LSTMAutoencoder
 from .anomaly_detector import AnomalyDetector
 from .log_processor import OpenStackLogProcessor
+from .threshold_calibrator import StreamingQuantileSketch, OnlineThresholdCalibrator
 
-__all__ = ['LSTMAutoencoder', 'AnomalyDetector', 'OpenStackLogProcessor']
+__all__ = ['LSTMAutoencoder', 'AnomalyDetector', 'OpenStackLogProcessor', 'StreamingQuantileSketch', 'OnlineThresholdCalibrator']
@@ -7,11 +7,14 @@ from .model import LSTMAutoencoder
 
 
 class AnomalyDetector:
-    def __init__(self, model_path='model/lstm_autoencoder_model.pth', threshold=0.280038, max_seq_len=100, vocab_size=36):
+    def __init__(self, model_path='model/lstm_autoencoder_model.pth', threshold=0.280038, max_seq_len=100, vocab_size=36, calibrator=None, inference_batch_size=256):
         self.vocab_size = vocab_size
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.threshold = threshold
         self.max_seq_len = max_seq_len
+        self.inference_batch_size = inference_batch_size
+        # Optional OnlineThresholdCalibrator; when set, thresholds follow streaming error quantiles
+        self.calibrator = calibrator
         
         self.model = LSTMAutoencoder(
             vocab_size=vocab_size,
@@ -58,7 +61,39 @@ class AnomalyDetector:
             
             return float(error)
     
-    def predict_single_sequence(self, sequence):
+    def calculate_batch_reconstruction_errors(self, sequences):
+        criterion = nn.CrossEntropyLoss(ignore_index=0, reduction='none')
+        errors = []
+        
+        # One forward pass per chunk keeps logits memory bounded for large detection cycles;
+        # padding is ignored by the loss as in the single-sequence path
+        for start in range(0, len(sequences), self.inference_batch_size):
+            chunk = sequences[start:start + self.inference_batch_size]
+            padded = [self.pad_sequence(seq, self.max_seq_len) for seq in chunk]
+            seq_tensor = torch.tensor(padded, dtype=torch.long).to(self.device)
+            
+            with torch.no_grad():
+                output = self.model(seq_tensor)
+                
+                token_losses = criterion(
+                    output.view(-1, self.vocab_size),
+                    seq_tensor.view(-1)
+                ).view(seq_tensor.size())
+                
+                mask = (seq_tensor != 0).float()
+                counts = mask.sum(dim=1)
+                chunk_errors = (token_losses * mask).sum(dim=1) / counts.clamp(min=1)
+                
+                errors.extend(float(e) for e in chunk_errors.cpu().tolist())
+        
+        return errors
+    
+    def get_threshold(self, key='global'):
+        if self.calibrator is None:
+            return self.threshold
+        return self.calibrator.threshold(key)
+    
+    def predict_single_sequence(self, sequence, key='global'):
         if len(sequence) < 3:
             return {
                 'is_anomaly': False,
@@ -68,20 +103,38 @@ class AnomalyDetector:
             }
         
         error = self.calculate_reconstruction_error(sequence)
-        is_anomaly = error > self.threshold
+        return self._score(error, key)
+    
+    def _score(self, error, key='global'):
+        threshold = self.get_threshold(key)
+        is_anomaly = error > threshold
         
-        confidence = abs(error - self.threshold) / self.threshold
+        confidence = abs(error - threshold) / threshold
         confidence = min(confidence, 1.0)
         
+        # Score against the current threshold first, then feed the error to the sketch
+        if self.calibrator is not None:
+            self.calibrator.update(error, key)
+        
         return {
             'is_anomaly': bool(is_anomaly),
             'reconstruction_error': float(error),
-            'threshold': float(self.threshold),
+            'threshold': float(threshold),
             'confidence': float(confidence)
         }
     
-    def predict_batch_sequences(self, sequences):
+    def predict_batch_sequences(self, sequences, keys=None):
+        if keys is None:
+            keys = ['global'] * len(sequences)
+        
+        valid = [i for i, seq in enumerate(sequences) if len(seq) >= 3]
+        errors = self.calculate_batch_reconstruction_errors([sequences[i] for i in valid])
+        errors = dict(zip(valid, errors))
+        
         results = []
-        for seq in sequences:
-            results.append(self.predict_single_sequence(seq))
+        for i, (seq, key) in enumerate(zip(sequences, keys)):
+            if i in errors:
+                results.append(self._score(errors[i], key))
+            else:
+                results.append(self.predict_single_sequence(seq, key))
         return results
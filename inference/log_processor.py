@@ -4,11 +4,13 @@ from datetime import datetime
 from logparser.Drain import LogParser
 import tempfile
 import os
+import threading
 from sklearn.preprocessing import LabelEncoder
+from .template_cache import CachedDrainParser
 
 
 class OpenStackLogProcessor:    
-    def __init__(self):
+    def __init__(self, template_cache_size=10000):
         self.log_format = '<Logfile> <Date> <Time> <Pid> <Level> <Component> \[<Context>\] <Content>'
         
         self.regex = [
@@ -31,6 +33,17 @@ class OpenStackLogProcessor:
         self.st = 0.3
         self.depth = 6
         
+        # 0 disables the masked-content template cache and falls back to plain Drain
+        self.template_cache_size = template_cache_size
+        # parse_logs may run concurrently on scoring service request threads
+        self.template_cache_lock = threading.Lock()
+        self.template_cache_stats = {
+            'hits': 0,
+            'misses': 0,
+            'invalidations': 0,
+            'evictions': 0
+        }
+        
         self.event_mapping = None
         self._load_event_mapping()
     
@@ -45,18 +58,34 @@ class OpenStackLogProcessor:
                 f.write(log_text)
             
             # Initialize Drain parser
-            parser = LogParser(
-                self.log_format,
-                indir=temp_dir,
-                outdir=temp_dir,
-                depth=self.depth,
-                st=self.st,
-                rex=self.regex
-            )
+            if self.template_cache_size > 0:
+                parser = CachedDrainParser(
+                    self.log_format,
+                    indir=temp_dir,
+                    outdir=temp_dir,
+                    depth=self.depth,
+                    st=self.st,
+                    rex=self.regex,
+                    cache_size=self.template_cache_size
+                )
+            else:
+                parser = LogParser(
+                    self.log_format,
+                    indir=temp_dir,
+                    outdir=temp_dir,
+                    depth=self.depth,
+                    st=self.st,
+                    rex=self.regex
+                )
             
             # Parse the log file
             parser.parse('temp.log')
             
+            if self.template_cache_size > 0:
+                with self.template_cache_lock:
+                    for key, value in parser.cache.stats.items():
+                        self.template_cache_stats[key] += value
+            
             # Read the parsed result
             structured_file = os.path.join(temp_dir, 'temp.log_structured.csv')
             df = pd.read_csv(structured_file)
@@ -67,6 +96,13 @@ class OpenStackLogProcessor:
         
         return df, templates_df
     
+    def get_template_cache_stats(self):
+        with self.template_cache_lock:
+            stats = dict(self.template_cache_stats)
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / total, 4) if total > 0 else 0.0
+        return stats
+    
     def prepare_for_detection(self, df, templates_df, vocab_size=36):
         df['Datetime'] = pd.to_datetime(df['Date'] + ' ' + df['Time'])
         
@@ -0,0 +1,112 @@
+import os
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from logparser.Drain import LogParser, Logcluster, Node
+
+
+class TemplateMatchCache:
+    # Bounded LRU from masked content to its Drain cluster.
+    # Drain only compares messages of equal token length, so a per-length generation
+    # counter is bumped whenever a cluster of that length is created or its template
+    # changes; entries recorded under an older generation are treated as stale.
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.generations = defaultdict(int)
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'invalidations': 0,
+            'evictions': 0
+        }
+
+    def get(self, content):
+        entry = self.entries.get(content)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+
+        cluster, length, generation = entry
+        if self.generations[length] != generation:
+            del self.entries[content]
+            self.stats['invalidations'] += 1
+            self.stats['misses'] += 1
+            return None
+
+        self.entries.move_to_end(content)
+        self.stats['hits'] += 1
+        return cluster
+
+    def put(self, content, cluster):
+        length = len(cluster.logTemplate)
+        self.entries[content] = (cluster, length, self.generations[length])
+        self.entries.move_to_end(content)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def invalidate_length(self, length):
+        self.generations[length] += 1
+
+    def hit_rate(self):
+        total = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / total if total > 0 else 0.0
+
+
+class CachedDrainParser(LogParser):
+    def __init__(self, *args, cache_size=10000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = TemplateMatchCache(max_size=cache_size)
+
+    def parse(self, logName):
+        # Same clustering loop as LogParser.parse, with the cache consulted before tree search
+        print("Parsing file: " + os.path.join(self.path, logName))
+        start_time = datetime.now()
+        self.logName = logName
+        rootNode = Node()
+        logCluL = []
+
+        self.load_data()
+
+        for logID, content in zip(self.df_log["LineId"], self.df_log["Content"]):
+            masked = self.preprocess(content).strip()
+
+            matchCluster = self.cache.get(masked)
+            if matchCluster is not None:
+                # An identical message re-matched to its cluster never changes the template.
+                # Messages shorter than the tree depth never reach a Drain leaf, so stock Drain starts
+                # a duplicate cluster for each one; they get merged here instead, which leaves the
+                # per-line EventId/EventTemplate output unchanged.
+                matchCluster.logIDL.append(logID)
+                continue
+
+            logmessageL = masked.split()
+            matchCluster = self.treeSearch(rootNode, logmessageL)
+
+            if matchCluster is None:
+                matchCluster = Logcluster(logTemplate=logmessageL, logIDL=[logID])
+                logCluL.append(matchCluster)
+                self.addSeqToPrefixTree(rootNode, matchCluster)
+                # Clusters shorter than the tree depth are never attached to a leaf, so treeSearch cannot
+                # return them and they cannot change how any other line matches
+                if len(logmessageL) >= self.depth:
+                    self.cache.invalidate_length(len(logmessageL))
+            else:
+                newTemplate = self.getTemplate(logmessageL, matchCluster.logTemplate)
+                matchCluster.logIDL.append(logID)
+                if " ".join(newTemplate) != " ".join(matchCluster.logTemplate):
+                    matchCluster.logTemplate = newTemplate
+                    self.cache.invalidate_length(len(newTemplate))
+
+            self.cache.put(masked, matchCluster)
+
+        if not os.path.exists(self.savePath):
+            os.makedirs(self.savePath)
+
+        self.outputResult(logCluL)
+
+        print(
+            "Parsing done. [Time taken: {!s}, template cache hit rate: {:.1%}]".format(
+                datetime.now() - start_time, self.cache.hit_rate()
+            )
+        )
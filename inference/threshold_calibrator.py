@@ -0,0 +1,307 @@
+import json
+import math
+import os
+import time
+
+
+class StreamingQuantileSketch:
+    # Merging t-digest: constant memory, mergeable across processes/services
+    def __init__(self, compression=100, buffer_size=500):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.means = []
+        self.weights = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []
+
+    def _k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inverse(self, k):
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _q_limit(self, q):
+        k = self._k(q) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return self._k_inverse(k)
+
+    def update(self, value, weight=1):
+        value = float(value)
+        if math.isnan(value):
+            return
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= self.buffer_size:
+            self._compress()
+
+    def _compress(self):
+        if not self._buffer:
+            return
+
+        points = sorted(list(zip(self.means, self.weights)) + self._buffer)
+        self._buffer = []
+        total = sum(w for _, w in points)
+
+        means, weights = [], []
+        cur_mean, cur_weight = points[0]
+        weight_so_far = 0
+        q_limit = self._q_limit(0.0)
+
+        for mean, weight in points[1:]:
+            if (weight_so_far + cur_weight + weight) / total <= q_limit:
+                cur_mean += (mean - cur_mean) * weight / (cur_weight + weight)
+                cur_weight += weight
+            else:
+                means.append(cur_mean)
+                weights.append(cur_weight)
+                weight_so_far += cur_weight
+                q_limit = self._q_limit(weight_so_far / total)
+                cur_mean, cur_weight = mean, weight
+
+        means.append(cur_mean)
+        weights.append(cur_weight)
+        self.means = means
+        self.weights = weights
+
+    def merge(self, other):
+        other._compress()
+        for mean, weight in zip(other.means, other.weights):
+            self._buffer.append((mean, weight))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        self._compress()
+        if self.count == 0:
+            return None
+        if len(self.means) == 1:
+            return self.means[0]
+
+        q = min(max(q, 0.0), 1.0)
+        target = q * self.count
+
+        # Centroid i covers [cumulative, cumulative + weight]; interpolate between centres
+        cumulative = 0
+        prev_center, prev_mean = 0.0, self.min
+        for mean, weight in zip(self.means, self.weights):
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - prev_center
+                if span <= 0:
+                    return mean
+                return prev_mean + (mean - prev_mean) * (target - prev_center) / span
+            prev_center, prev_mean = center, mean
+            cumulative += weight
+
+        span = self.count - prev_center
+        if span <= 0:
+            return self.max
+        return prev_mean + (self.max - prev_mean) * (target - prev_center) / span
+
+    def to_dict(self):
+        self._compress()
+        return {
+            'compression': self.compression,
+            'count': self.count,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'means': self.means,
+            'weights': self.weights
+        }
+
+    @classmethod
+    def from_dict(cls, data, buffer_size=500):
+        sketch = cls(compression=data.get('compression', 100), buffer_size=buffer_size)
+        sketch.means = list(data.get('means', []))
+        sketch.weights = list(data.get('weights', []))
+        sketch.count = data.get('count', sum(sketch.weights))
+        if sketch.count:
+            sketch.min = data['min']
+            sketch.max = data['max']
+        return sketch
+
+
+class RollingQuantileWindow:
+    # Rotates a fresh sketch every period and keeps only the last window_periods of them,
+    # so old traffic ages out and the quantile keeps following workload drift
+    def __init__(self, period_seconds=3600, window_periods=24, compression=100):
+        self.period_seconds = period_seconds
+        self.window_periods = window_periods
+        self.compression = compression
+        self.periods = []
+
+    def _rotate(self, now):
+        if self.periods and now - self.periods[-1]['start'] < self.period_seconds:
+            return False
+
+        self.periods.append({
+            'start': now,
+            'sketch': StreamingQuantileSketch(compression=self.compression)
+        })
+        self.periods = [p for p in self.periods if now - p['start'] < self.period_seconds * self.window_periods]
+        return True
+
+    def update(self, value, now=None):
+        # True when a new period started, so older periods may have aged out
+        rotated = self._rotate(time.time() if now is None else now)
+        self.periods[-1]['sketch'].update(value)
+        return rotated
+
+    def count(self):
+        return sum(p['sketch'].count for p in self.periods)
+
+    def merged(self):
+        merged = StreamingQuantileSketch(compression=self.compression)
+        for period in self.periods:
+            merged.merge(period['sketch'])
+        return merged
+
+    def quantile(self, q):
+        return self.merged().quantile(q)
+
+    def to_dict(self):
+        return {
+            'periods': [
+                {'start': p['start'], 'sketch': p['sketch'].to_dict()}
+                for p in self.periods
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data, period_seconds=3600, window_periods=24, compression=100, now=None):
+        window = cls(period_seconds=period_seconds, window_periods=window_periods, compression=compression)
+        now = time.time() if now is None else now
+        window.periods = [
+            {
+                'start': p['start'],
+                'sketch': StreamingQuantileSketch.from_dict(p['sketch'])
+            }
+            for p in data.get('periods', [])
+            if now - p['start'] < period_seconds * window_periods
+        ]
+        return window
+
+
+class OnlineThresholdCalibrator:
+    def __init__(self, base_threshold, quantile=0.99, min_samples=200, min_threshold=None, max_threshold=None, compression=100, period_minutes=60, window_periods=24, outlier_factor=1.5, outlier_max_minutes=None, recompute_every=100, state_path=None):
+        self.base_threshold = base_threshold
+        self.quantile = quantile
+        self.min_samples = min_samples
+        # Guard rails: the adaptive threshold never leaves [min_threshold, max_threshold]
+        self.min_threshold = min_threshold if min_threshold is not None else base_threshold * 0.5
+        self.max_threshold = max_threshold if max_threshold is not None else base_threshold * 2.0
+        self.compression = compression
+        self.period_seconds = period_minutes * 60
+        self.window_periods = window_periods
+        # Errors above outlier_factor x the current threshold are left out of the sketch, so a burst
+        # of clearly anomalous sequences cannot raise its own threshold; errors just above it still
+        # feed in so the threshold can follow gradual drift. None disables the exclusion.
+        # A step increase beyond outlier_factor looks exactly like an incident, so exclusion is capped:
+        # once outliers for a key have kept arriving (no gap of outlier_max_minutes) for longer than
+        # outlier_max_minutes (default: one period), they are treated as a level shift and fed in.
+        # Incidents lasting longer than that will therefore start raising their own threshold.
+        self.outlier_factor = outlier_factor
+        self.outlier_max_seconds = (outlier_max_minutes if outlier_max_minutes is not None else period_minutes) * 60
+        self.excluded = 0
+        self._outlier_streaks = {}
+        self.state_path = state_path
+        self.windows = {}
+        # Thresholds are cached and recomputed after recompute_every updates to a key, on period
+        # rotation and after each save(), rather than on every scored sequence. Buffer flushes are
+        # not a usable signal because quantiles() and save() also flush the buffers.
+        self.recompute_every = recompute_every
+        self._thresholds = {}
+        self._pending = {}
+
+        if state_path and os.path.exists(state_path):
+            self.load(state_path)
+
+    def _window(self, key):
+        if key not in self.windows:
+            self.windows[key] = RollingQuantileWindow(
+                period_seconds=self.period_seconds,
+                window_periods=self.window_periods,
+                compression=self.compression
+            )
+        return self.windows[key]
+
+    def _exclude_outlier(self, key, now):
+        # Streak is (first outlier, latest outlier); a quiet gap of outlier_max_seconds starts a new one
+        start, last = self._outlier_streaks.get(key, (now, now))
+        if now - last > self.outlier_max_seconds:
+            start = now
+        self._outlier_streaks[key] = (start, now)
+        return now - start <= self.outlier_max_seconds
+
+    def update(self, error, key='global'):
+        if self.outlier_factor is not None and error > self.threshold(key) * self.outlier_factor:
+            if self._exclude_outlier(key, time.time()):
+                self.excluded += 1
+                return
+        rotated = self._window(key).update(error)
+        self._pending[key] = self._pending.get(key, 0) + 1
+        if rotated or self._pending[key] >= self.recompute_every:
+            self._thresholds.pop(key, None)
+
+    def quantiles(self, qs=(0.5, 0.9, 0.95, 0.99), key='global'):
+        window = self.windows.get(key)
+        if window is None:
+            return {q: None for q in qs}
+        return {q: window.quantile(q) for q in qs}
+
+    def threshold(self, key='global'):
+        cached = self._thresholds.get(key)
+        if cached is not None:
+            return cached
+
+        window = self.windows.get(key)
+        if window is None or window.count() < self.min_samples:
+            return self.base_threshold
+
+        value = window.quantile(self.quantile)
+        threshold = min(max(value, self.min_threshold), self.max_threshold)
+        self._thresholds[key] = threshold
+        self._pending[key] = 0
+        return threshold
+
+    def save(self, path=None):
+        path = path or self.state_path
+        if not path:
+            return
+
+        # Only sketch data is persisted; quantile and guard rails always come from configuration
+        state = {
+            'windows': {key: window.to_dict() for key, window in self.windows.items()}
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+        self._thresholds = {}
+
+    def load(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.windows = {
+                key: RollingQuantileWindow.from_dict(
+                    data,
+                    period_seconds=self.period_seconds,
+                    window_periods=self.window_periods,
+                    compression=self.compression
+                )
+                for key, data in state.get('windows', {}).items()
+            }
+            self._thresholds = {}
+            print(f"Threshold calibration state loaded from {path}")
+        except Exception as e:
+            print(f"Error loading calibration state: {e}")
+            self.windows = {}
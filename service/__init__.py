@@ -0,0 +1,6 @@
+"""
+Scoring service package for on-demand OpenStack log anomaly detection
+"""
+from .scoring_service import MicroBatcher, create_app
+
+__all__ = ['MicroBatcher', 'create_app']
@@ -0,0 +1,80 @@
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+
+
+def random_sequence(vocab_size=36, min_len=5, max_len=50):
+    return [random.randint(1, vocab_size - 1) for _ in range(random.randint(min_len, max_len))]
+
+
+_local = threading.local()
+
+
+def send_request(url, sequence):
+    # One session per worker thread; requests.Session is not safe to share across threads
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+
+    start = time.perf_counter()
+    try:
+        response = session.post(url, json={'sequence': sequence}, timeout=30)
+        ok = response.status_code == 200
+    except requests.RequestException:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run_level(url, concurrency, total_requests):
+    sequences = [random_sequence() for _ in range(total_requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(send_request, url, seq) for seq in sequences]
+        outcomes = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, ok in outcomes if ok]) * 1000
+    errors = sum(1 for _, ok in outcomes if not ok)
+
+    return {
+        'concurrency': concurrency,
+        'requests': total_requests,
+        'errors': errors,
+        'p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else float('nan'),
+        'p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else float('nan'),
+        'throughput_rps': (total_requests - errors) / elapsed if elapsed > 0 else 0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test for the anomaly scoring service')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', default='1,2,4,8,16,32,64', help='Comma-separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per concurrency level')
+    args = parser.parse_args()
+
+    score_url = f"{args.url.rstrip('/')}/score"
+    levels = [int(c) for c in args.concurrency.split(',')]
+
+    # Warm up the model and connection pool before measuring
+    run_level(score_url, 1, 20)
+
+    print(f"{'concurrency':>12} {'requests':>9} {'errors':>7} {'p50 (ms)':>10} {'p99 (ms)':>10} {'req/s':>10}")
+    for concurrency in levels:
+        stats = run_level(score_url, concurrency, args.requests)
+        print(
+            f"{stats['concurrency']:>12} {stats['requests']:>9} {stats['errors']:>7} "
+            f"{stats['p50_ms']:>10.2f} {stats['p99_ms']:>10.2f} {stats['throughput_rps']:>10.1f}"
+        )
+
+    health = requests.get(f"{args.url.rstrip('/')}/health", timeout=5).json()
+    print(f"\nBatching stats: {health.get('batching', {})}")
+
+
+if __name__ == '__main__':
+    main()
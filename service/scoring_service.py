@@ -0,0 +1,218 @@
+import os
+import sys
+import time
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from flask import Flask, jsonify, request
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference.anomaly_detector import AnomalyDetector
+from inference.log_processor import OpenStackLogProcessor
+
+
+class MicroBatcher:
+    def __init__(self, detector, max_batch_size=32, max_wait_ms=5):
+        self.detector = detector
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self.queue = queue.Queue()
+        self.stats_lock = threading.Lock()
+        self.stats = {
+            'batches': 0,
+            'sequences': 0,
+            'max_batch_size_seen': 0
+        }
+
+        # Model inference only ever runs on this worker, so the detector needs no locking
+        self._stopped = threading.Event()
+        self.worker = threading.Thread(target=self._run, name='scoring-worker', daemon=True)
+        self.worker.start()
+
+    def submit(self, sequence, key='global'):
+        future = Future()
+        self.queue.put((sequence, key, future))
+        return future
+
+    def score(self, sequences, keys=None, timeout=30):
+        if keys is None:
+            keys = ['global'] * len(sequences)
+        futures = [self.submit(seq, key) for seq, key in zip(sequences, keys)]
+        return [future.result(timeout=timeout) for future in futures]
+
+    def _collect_batch(self):
+        try:
+            batch = [self.queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        # Flush on whichever comes first: a full batch or max_wait after the first item
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            sequences = [item[0] for item in batch]
+            keys = [item[1] for item in batch]
+            futures = [item[2] for item in batch]
+
+            try:
+                results = self.detector.predict_batch_sequences(sequences, keys)
+            except Exception as e:
+                print(f"Error scoring batch: {e}")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+            with self.stats_lock:
+                self.stats['batches'] += 1
+                self.stats['sequences'] += len(batch)
+                self.stats['max_batch_size_seen'] = max(self.stats['max_batch_size_seen'], len(batch))
+
+    def get_stats(self):
+        with self.stats_lock:
+            stats = dict(self.stats)
+        stats['avg_batch_size'] = round(stats['sequences'] / stats['batches'], 2) if stats['batches'] > 0 else 0
+        stats['queue_depth'] = self.queue.qsize()
+        return stats
+
+    def stop(self):
+        self._stopped.set()
+        self.worker.join(timeout=1)
+
+
+def _validate_sequence(sequence, vocab_size):
+    # 0 is the padding index and is ignored by the loss; real event IDs start at 1
+    if not isinstance(sequence, list) or not all(isinstance(e, int) and not isinstance(e, bool) and e >= 1 for e in sequence):
+        raise ValueError("sequence must be a list of positive integer event IDs")
+    # Out-of-vocabulary IDs map to the unknown token, as in OpenStackLogProcessor.prepare_for_detection
+    return [min(e, vocab_size - 1) for e in sequence]
+
+
+def create_app(detector, log_processor, batcher):
+    app = Flask(__name__)
+
+    @app.errorhandler(FutureTimeoutError)
+    def scoring_timeout(e):
+        return jsonify({'error': 'timed out waiting for the scoring worker'}), 504
+
+    @app.route('/health', methods=['GET'])
+    def health():
+        return jsonify({
+            'status': 'ok',
+            'threshold': detector.threshold,
+            'batching': batcher.get_stats(),
+            'template_cache': log_processor.get_template_cache_stats()
+        })
+
+    @app.route('/score', methods=['POST'])
+    def score():
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            payload = {}
+
+        try:
+            if 'sequence' in payload:
+                sequence = _validate_sequence(payload['sequence'], detector.vocab_size)
+                result = batcher.score([sequence], [payload.get('key', 'global')])[0]
+                return jsonify(result)
+
+            if 'sequences' in payload and isinstance(payload['sequences'], dict):
+                request_ids = list(payload['sequences'].keys())
+                sequences = [_validate_sequence(payload['sequences'][r], detector.vocab_size) for r in request_ids]
+                keys = payload.get('keys') if isinstance(payload.get('keys'), dict) else {}
+                results = batcher.score(sequences, [keys.get(r, 'global') for r in request_ids])
+                return jsonify({'results': dict(zip(request_ids, results))})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return jsonify({'error': "expected 'sequence' (list) or 'sequences' (object of request ID to list)"}), 400
+
+    @app.route('/score/logs', methods=['POST'])
+    def score_logs():
+        payload = request.get_json(silent=True)
+        log_text = payload.get('logs') if isinstance(payload, dict) else request.get_data(as_text=True)
+
+        if not isinstance(log_text, str) or not log_text.strip():
+            return jsonify({'error': "expected raw log text or JSON with a 'logs' field"}), 400
+
+        try:
+            processed_df = log_processor.process_raw_logs(log_text)
+        except Exception as e:
+            return jsonify({'error': f"failed to parse logs: {e}"}), 400
+
+        sequences = log_processor.extract_sequences(processed_df)
+        request_ids = list(sequences.keys())
+        components = processed_df.groupby('RequestID')['Component'].first().to_dict()
+        keys = [components.get(req_id, 'global') for req_id in request_ids]
+
+        results = batcher.score([sequences[r] for r in request_ids], keys)
+
+        anomalies = [req_id for req_id, result in zip(request_ids, results) if result.get('is_anomaly', False)]
+        total_sequences = len(request_ids)
+
+        return jsonify({
+            'timestamp': datetime.utcnow().isoformat(),
+            'summary': {
+                'total_log_entries': len(processed_df),
+                'total_sequences': total_sequences,
+                'anomalies': len(anomalies),
+                'normal': total_sequences - len(anomalies),
+                'anomaly_rate': round(len(anomalies) / total_sequences * 100, 2) if total_sequences > 0 else 0
+            },
+            'anomalies': anomalies,
+            'results': dict(zip(request_ids, results))
+        })
+
+    return app
+
+
+def main():
+    HOST = os.getenv("SCORING_HOST", "127.0.0.1")
+    PORT = int(os.getenv("SCORING_PORT", "5000"))
+    MAX_BATCH_SIZE = int(os.getenv("SCORING_MAX_BATCH_SIZE", "32"))
+    MAX_WAIT_MS = float(os.getenv("SCORING_MAX_WAIT_MS", "5"))
+
+    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    model_path = os.path.join(BASE_DIR, 'model', 'lstm_autoencoder_model.pth')
+
+    detector = AnomalyDetector(
+        model_path=model_path,
+        threshold=0.280038,
+        max_seq_len=100,
+        vocab_size=36
+    )
+    log_processor = OpenStackLogProcessor()
+    batcher = MicroBatcher(detector, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS)
+
+    app = create_app(detector, log_processor, batcher)
+
+    print(f"Scoring service listening on http://{HOST}:{PORT} (max batch: {MAX_BATCH_SIZE}, max wait: {MAX_WAIT_MS} ms)")
+    try:
+        app.run(host=HOST, port=PORT, threaded=True)
+    finally:
+        batcher.stop()
+
+
+if __name__ == '__main__':
+    main()